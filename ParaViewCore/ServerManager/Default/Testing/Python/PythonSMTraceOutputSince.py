@@ -0,0 +1,39 @@
+# This test checks that smtrace.get_current_trace_output_since() returns only
+# the trace generated since the offset returned by the previous call, and that
+# the pieces add up to the full trace.
+
+from paraview.simple import *
+from paraview import smtrace
+from paraview import smtesting
+
+smtesting.ProcessCommandLineArguments()
+
+def fail(message):
+    raise Exception(message)
+
+config = smtrace.start_trace()
+
+text, offset = smtrace.get_current_trace_output_since()
+if text != smtrace.get_current_trace_output():
+    fail("Offset 0 should return the entire trace.")
+
+sphere = Sphere()
+new_text, offset = smtrace.get_current_trace_output_since(offset)
+if "Sphere(" not in new_text or "import" in new_text:
+    fail("Incorrect trace returned for sphere creation:\n%s" % new_text)
+text = "%s\n%s" % (text, new_text)
+
+Shrink(Input=sphere)
+new_text, offset = smtrace.get_current_trace_output_since(offset)
+if "Shrink(" not in new_text or "Sphere(" in new_text:
+    fail("Incorrect trace returned for shrink creation:\n%s" % new_text)
+text = "%s\n%s" % (text, new_text)
+
+if text != smtrace.get_current_trace_output():
+    fail("Incremental trace doesn't match the complete trace.")
+
+new_text, offset = smtrace.get_current_trace_output_since(offset)
+if new_text:
+    fail("No new trace was expected.")
+
+smtrace.stop_trace()
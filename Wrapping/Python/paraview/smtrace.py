@@ -61,9 +61,17 @@ RealProxyAccessor keeps a hard reference to the servermanager.Proxy instance.
 This is required. If we don't, then the Python object for vtkSMProxy also gets
 garbage collected since there's no reference to it.
 
+For the same reason, :class:`.Trace` keeps its registry of accessors in a
+regular dict keyed by the servermanager.Proxy rather than in a
+weakref.WeakKeyDictionary: the accessor (the value) references the proxy (the
+key), so weak keys would never be released anyway. Accessors for proxies that
+are unregistered while tracing are released explicitly by the
+:class:`.CleanupAccessor` trace item instead.
+
 """
 from __future__ import absolute_import, division, print_function
 
+import re
 import weakref
 import paraview.servermanager as sm
 import paraview.simple as simple
@@ -73,26 +81,64 @@ from paraview.vtk import vtkTimeStamp
 if sys.version_info >= (3,):
     xrange = range
 
-class TraceOutput:
+# cache of compiled regular expressions used to extract the array name from the
+# registration name for transfer functions, keyed by the proxy's XML name.
+_TF_REGNAME_PATTERNS = {}
+
+def _get_tf_regname_pattern(xmlname):
+    try:
+        return _TF_REGNAME_PATTERNS[xmlname]
+    except KeyError:
+        pattern = re.compile("^[0-9.]*(.+)\\.%s$" % re.escape(xmlname))
+        _TF_REGNAME_PATTERNS[xmlname] = pattern
+        return pattern
+
+# cache of names made valid using servermanager._make_name_valid, keyed by the
+# original name. These are mostly XML labels for proxies and properties which
+# are the same for all proxies of a given type. Cleared in Trace.reset().
+_VALID_NAMES = {}
+
+def _make_name_valid(name):
+    try:
+        return _VALID_NAMES[name]
+    except KeyError:
+        valid_name = sm._make_name_valid(name)
+        _VALID_NAMES[name] = valid_name
+        return valid_name
+
+class TraceOutput(object):
   """Internal class used to collect the trace output. Everytime anything is pushed into
   this using the append API, we ensure that the trace is updated. Trace
   doesn't put commands to the trace-output as soon as modifications are noticed
   to try to consolidate the state changes."""
+  __slots__ = ("__data", "__cached")
+
   def __init__(self, data=None):
     self.__data = []
+    # joined trace text, rebuilt lazily by __str__ after any modification.
+    self.__cached = None
     self.append(data) if data else None
 
   def append(self, data):
     if isinstance(data, list):
       self.__data += data
+      self.__cached = None
       #print ("\n".join(data),"\n")
+    elif isinstance(data, TraceOutput):
+      # splice the other output's lines directly rather than going through
+      # raw_data() which invalidates its cached text.
+      self.__data += data.__data
+      self.__cached = None
     elif isinstance(data, str):
       self.__data.append(data)
+      self.__cached = None
       #print (data,"\n")
 
   def append_separator(self):
     try:
-      self.__data.append("") if self.__data[-1] != "" else None
+      if self.__data[-1] != "":
+        self.__data.append("")
+        self.__cached = None
     except IndexError:
       pass
 
@@ -101,14 +147,37 @@ class TraceOutput:
       self.append(data)
 
   def __str__(self):
-    return '\n'.join(self.__data)
-
-  def raw_data(self): return self.__data
-
-  def reset(self): self.__data = []
+    if self.__cached is None:
+      self.__cached = '\n'.join(self.__data)
+    return self.__cached
+
+  def get_since(self, offset=0):
+    """Returns a tuple `(text, offset)` where `text` is the trace added after
+    `offset` and `offset` is the value to pass to the next call to only get
+    the trace added after this call. This avoids regenerating the entire trace
+    text for clients that poll the trace as it is being generated. When
+    `text` is not empty, `str(self)` is the text obtained so far and `text`
+    joined by a newline. If the output has fewer lines than `offset`, e.g.
+    since it was reset, the entire trace is returned."""
+    if offset > len(self.__data):
+      offset = 0
+    return '\n'.join(self.__data[offset:]), len(self.__data)
+
+  def raw_data(self):
+    # the caller may modify the returned list, so we cannot trust the cache
+    # anymore.
+    self.__cached = None
+    return self.__data
+
+  def reset(self):
+    self.__data = []
+    self.__cached = None
 
 class Trace(object):
     __REGISTERED_ACCESSORS = {}
+    # number of registered accessors using each variable name. Kept in sync
+    # with __REGISTERED_ACCESSORS by register_accessor/unregister_accessor.
+    __REGISTERED_VARNAMES = {}
 
     Output = None
 
@@ -116,25 +185,28 @@ class Trace(object):
     def reset(cls):
         """Resets the Output and clears all register accessors."""
         cls.__REGISTERED_ACCESSORS.clear()
+        cls.__REGISTERED_VARNAMES.clear()
+        cls.__SIMPLE_GETTER_CACHE = None
+        _VALID_NAMES.clear()
         cls.Output = TraceOutput()
 
     @classmethod
     def get_registered_name(cls, proxy, reggroup):
         """Returns the registered name for `proxy` in the given `reggroup`."""
-        return proxy.SMProxy.GetSessionProxyManager().GetProxyName(reggroup, proxy.SMProxy)
+        smproxy = proxy.SMProxy
+        return smproxy.GetSessionProxyManager().GetProxyName(reggroup, smproxy)
 
     @classmethod
     def get_varname(cls, name):
         """returns an unique variable name given a suggested variable name. If
         the suggested variable name is already taken, this method will try to
         find a good suffix that's available."""
-        name = sm._make_name_valid(name)
+        name = _make_name_valid(name)
         name = name[0].lower() + name[1:]
         original_name = name
         suffix = 1
-        # build a set of existing variable names
-        varnameset = set([accessor.Varname for accessor in cls.__REGISTERED_ACCESSORS.values()])
-        while name in varnameset:
+        varnames = cls.__REGISTERED_VARNAMES
+        while name in varnames:
             name = "%s_%d" % (original_name, suffix)
             suffix += 1
         return name
@@ -142,12 +214,27 @@ class Trace(object):
     @classmethod
     def register_accessor(cls, accessor):
         """Register an instance of an Accessor or subclass"""
-        cls.__REGISTERED_ACCESSORS[accessor.get_object()] = accessor
+        obj = accessor.get_object()
+        if obj in cls.__REGISTERED_ACCESSORS:
+            cls.__release_varname(cls.__REGISTERED_ACCESSORS[obj].Varname)
+        cls.__REGISTERED_ACCESSORS[obj] = accessor
+        varnames = cls.__REGISTERED_VARNAMES
+        varnames[accessor.Varname] = varnames.get(accessor.Varname, 0) + 1
 
     @classmethod
     def unregister_accessor(cls, accessor):
-        if accessor.get_object() in cls.__REGISTERED_ACCESSORS:
-            del cls.__REGISTERED_ACCESSORS[accessor.get_object()]
+        obj = accessor.get_object()
+        if obj in cls.__REGISTERED_ACCESSORS:
+            cls.__release_varname(cls.__REGISTERED_ACCESSORS[obj].Varname)
+            del cls.__REGISTERED_ACCESSORS[obj]
+
+    @classmethod
+    def __release_varname(cls, varname):
+        count = cls.__REGISTERED_VARNAMES.get(varname, 0) - 1
+        if count > 0:
+            cls.__REGISTERED_VARNAMES[varname] = count
+        else:
+            cls.__REGISTERED_VARNAMES.pop(varname, None)
 
     @classmethod
     def get_accessor(cls, obj):
@@ -158,158 +245,192 @@ class Trace(object):
         if obj is None:
             return None
         assert isinstance(obj, sm.Proxy)
-        try:
+        accessor = cls.__REGISTERED_ACCESSORS.get(obj)
+        if accessor is not None:
+            return accessor
+        # Create accessor if possible else raise
+        # "untraceable" exception.
+        if cls.create_accessor(obj):
             return cls.__REGISTERED_ACCESSORS[obj]
-        except KeyError:
-            # Create accessor if possible else raise
-            # "untraceable" exception.
-            if cls.create_accessor(obj):
-                return cls.__REGISTERED_ACCESSORS[obj]
-            #return "<unknown>"
-            raise Untraceable(
-                    "%s is not 'known' at this point. Hence, we cannot trace "\
-                    "it. Skipping this action." % repr(obj))
+        #return "<unknown>"
+        raise UnknownProxy(obj)
 
     @classmethod
     def has_accessor(cls, obj):
         return obj in cls.__REGISTERED_ACCESSORS
 
+    # registration groups probed by create_accessor() in order, with the name
+    # of the classmethod that creates the accessor for proxies registered in
+    # that group. Each handler is called as `handler(proxy, registered_name)`
+    # and returns True if it created an accessor.
+    _CREATE_ACCESSOR_HANDLERS = (
+        ("sources", "_create_accessor_for_source"),
+        ("views", "_create_accessor_for_view"),
+        ("representations", "_create_accessor_for_representation"),
+        ("lookup_tables", "_create_accessor_for_tf"),
+        ("piecewise_functions", "_create_accessor_for_tf"),
+        ("scalar_bars", "_create_accessor_for_scalar_bar"),
+        ("animation", "_create_accessor_for_animation_proxies"),
+        ("layouts", "_create_accessor_for_layout"))
+
+    # results of the argument-less paraview.simple getters (GetActiveView,
+    # GetActiveSource, etc.) cached for the duration of the outermost
+    # create_accessor() call. None when no create_accessor() call is active.
+    __SIMPLE_GETTER_CACHE = None
+
+    @classmethod
+    def _simple_get(cls, getter_name):
+        """Returns the result of calling `paraview.simple.<getter_name>()`.
+        While an accessor is being created, the result is cached since
+        creating accessors (which may recursively create accessors for
+        inputs, views etc.) doesn't change the active objects."""
+        cache = cls.__SIMPLE_GETTER_CACHE
+        if cache is None:
+            return getattr(simple, getter_name)()
+        try:
+            return cache[getter_name]
+        except KeyError:
+            value = cache[getter_name] = getattr(simple, getter_name)()
+            return value
+
     @classmethod
     def create_accessor(cls, obj):
         """Create a new accessor for a proxy. This returns True when a
         ProxyAccessor has been created, other returns False. This is needed to
         bring into trace proxies that were either already created when the trace
         was started or were created indirectly and hence not explicitly traced."""
-        if isinstance(obj, sm.SourceProxy):
-            # handle pipeline source/filter proxy.
-            pname = obj.SMProxy.GetSessionProxyManager().GetProxyName("sources", obj.SMProxy)
-            if pname:
-                if obj == simple.GetActiveSource():
-                    accessor = ProxyAccessor(cls.get_varname(pname), obj)
-                    cls.Output.append_separated([\
-                        "# get active source.",
-                        "%s = GetActiveSource()" % accessor])
-                else:
-                    accessor = ProxyAccessor(cls.get_varname(pname), obj)
-                    cls.Output.append_separated([\
-                        "# find source",
-                        "%s = FindSource('%s')" % (accessor, pname)])
-                return True
-        if obj.SMProxy.IsA("vtkSMViewProxy"):
-            # handle view proxy.
-            pname = obj.SMProxy.GetSessionProxyManager().GetProxyName("views", obj.SMProxy)
-            if pname:
-                trace = TraceOutput()
-                accessor = ProxyAccessor(cls.get_varname(pname), obj)
-                if obj == simple.GetActiveView():
-                    trace.append("# get active view")
-                    trace.append("%s = GetActiveViewOrCreate('%s')" % (accessor, obj.GetXMLName()))
-                else:
-                    ctor_args = "'%s', viewtype='%s'" % (pname, obj.GetXMLName())
-                    trace.append("# find view")
-                    trace.append("%s = FindViewOrCreate(%s)" % (accessor, ctor_args))
-                # trace view size, if present. We trace this commented out so
-                # that the playback in the GUI doesn't cause issues.
-                viewSizeAccessor = accessor.get_property("ViewSize")
-                if viewSizeAccessor:
-                    trace.append([\
-                        "# uncomment following to set a specific view size",
-                        "# %s" % viewSizeAccessor.get_property_trace(in_ctor=False)])
-                cls.Output.append_separated(trace.raw_data())
-                return True
-        if obj.SMProxy.IsA("vtkSMRepresentationProxy"):
-            # handle representations.
-            if hasattr(obj, "Input"):
-                inputAccsr = cls.get_accessor(obj.Input)
-                view = simple.LocateView(obj)
-                viewAccessor = cls.get_accessor(view)
-                pname = obj.SMProxy.GetSessionProxyManager().GetProxyName("representations", obj.SMProxy)
-                if pname:
-                    varname = "%sDisplay" % inputAccsr
-                    accessor = ProxyAccessor(cls.get_varname(varname), obj)
-                    cls.Output.append_separated([\
-                        "# get display properties",
-                        "%s = GetDisplayProperties(%s, view=%s)" %\
-                            (accessor, inputAccsr, viewAccessor)])
-                    return True
-        if cls.get_registered_name(obj, "lookup_tables"):
-            pname = cls.get_registered_name(obj, "lookup_tables")
-            if cls._create_accessor_for_tf(obj, pname):
-                return True
-        if cls.get_registered_name(obj, "piecewise_functions"):
-            pname = cls.get_registered_name(obj, "piecewise_functions")
-            if cls._create_accessor_for_tf(obj, pname):
-                return True
-        if cls.get_registered_name(obj, "scalar_bars"):
-            # trace scalar bar.
-            lutAccessor = cls.get_accessor(obj.LookupTable)
-            view = simple.LocateView(obj)
-            viewAccessor = cls.get_accessor(view)
-            varname = cls.get_varname("%sColorBar" % lutAccessor)
-            accessor = ProxyAccessor(varname, obj)
-            trace = TraceOutput()
-            trace.append(\
-                "# get color legend/bar for %s in view %s" % (lutAccessor, viewAccessor))
-            trace.append(accessor.trace_ctor(\
-                "GetScalarBar",
-                SupplementalProxy(ScalarBarProxyFilter()),
-                ctor_args="%s, %s" % (lutAccessor, viewAccessor)))
-            cls.Output.append_separated(trace.raw_data())
-            return True
-        if cls.get_registered_name(obj, "animation"):
-            return cls._create_accessor_for_animation_proxies(obj)
-        if cls.get_registered_name(obj, "layouts"):
-            view = simple.GetActiveView()
-            if view and obj.GetViewLocation(view.SMProxy) != -1:
-                viewAccessor = cls.get_accessor(view)
-                varname = cls.get_varname(cls.get_registered_name(obj, "layouts"))
-                accessor = ProxyAccessor(varname, obj)
-                cls.Output.append_separated([\
-                    "# get layout",
-                    "%s = GetLayout()" % accessor])
-                return True
-            else:
-                varname = cls.get_varname(cls.get_registered_name(obj, "layouts"))
-                accessor = ProxyAccessor(varname, obj)
-                cls.Output.append_separated([\
-                    "# get layout",
-                    "%s = GetLayoutByName(\"%s\")" % (accessor, cls.get_registered_name(obj, "layouts"))])
+        if cls.__SIMPLE_GETTER_CACHE is not None:
+            # nested call, e.g. to create the accessor for a representation's input.
+            return cls._create_accessor_internal(obj)
+        cls.__SIMPLE_GETTER_CACHE = {}
+        try:
+            return cls._create_accessor_internal(obj)
+        finally:
+            cls.__SIMPLE_GETTER_CACHE = None
+
+    @classmethod
+    def _create_accessor_internal(cls, obj):
+        smproxy = obj.SMProxy
+        pxm = smproxy.GetSessionProxyManager()
+        for group, handler in cls._CREATE_ACCESSOR_HANDLERS:
+            pname = pxm.GetProxyName(group, smproxy)
+            if pname and getattr(cls, handler)(obj, pname):
                 return True
-        if obj.SMProxy.IsA("vtkSMTimeKeeperProxy"):
-            tkAccessor = ProxyAccessor(cls.get_varname(cls.get_registered_name(obj, "timekeeper")), obj)
-            cls.Output.append_separated([\
-                    "# get the time-keeper",
-                    "%s = GetTimeKeeper()" % tkAccessor])
+        if smproxy.IsA("vtkSMTimeKeeperProxy"):
+            cls._trace_new_accessor(pxm.GetProxyName("timekeeper", smproxy), obj,
+                "# get the time-keeper", "%s = GetTimeKeeper()")
             return True
         if obj.GetVTKClassName() == "vtkPVLight":
+            pname = pxm.GetProxyName("additional_lights", smproxy)
             view = simple.GetViewForLight(obj)
             if view:
                 index = view.AdditionalLights.index(obj)
                 viewAccessor = cls.get_accessor(view)
-                accessor = ProxyAccessor(cls.get_varname(cls.get_registered_name(obj, "additional_lights")), obj)
-                cls.Output.append_separated([\
-                   "# get light",
-                   "%s = GetLight(%s, %s)" % (accessor, index, viewAccessor)])
+                cls._trace_new_accessor(pname, obj,
+                    "# get light", "%s = GetLight(%s, %s)", index, viewAccessor)
             else:
                 # create a new light, should be handled by RegisterLightProxy
-                accessor = ProxyAccessor(cls.get_varname(cls.get_registered_name(obj, "additional_lights")), obj)
-                cls.Output.append_separated([\
-                    "# create a new light",
-                    "%s = CreateLight()" % (accessor)])
+                cls._trace_new_accessor(pname, obj,
+                    "# create a new light", "%s = CreateLight()")
             return True
-        if obj.SMProxy.IsA("vtkSMMaterialLibraryProxy"):
-            tkAccessor = ProxyAccessor(cls.get_varname(cls.get_registered_name(obj, "materiallibrary")), obj)
-            cls.Output.append_separated([\
-                    "# get the material library",
-                    "%s = GetMaterialLibrary()" % tkAccessor])
+        if smproxy.IsA("vtkSMMaterialLibraryProxy"):
+            cls._trace_new_accessor(pxm.GetProxyName("materiallibrary", smproxy), obj,
+                "# get the material library", "%s = GetMaterialLibrary()")
             return True
 
 
         return False
 
+    @classmethod
+    def _trace_new_accessor(cls, varname, obj, comment, line, *args):
+        """Creates a ProxyAccessor for `obj` using a unique variable name based
+        on `varname` and traces `comment` followed by `line % (accessor, *args)`.
+        Returns the new accessor."""
+        accessor = ProxyAccessor(cls.get_varname(varname), obj)
+        cls.Output.append_separated([comment, line % ((accessor,) + args)])
+        return accessor
+
+    @classmethod
+    def _create_accessor_for_source(cls, obj, pname):
+        """handle pipeline source/filter proxy."""
+        if not isinstance(obj, sm.SourceProxy):
+            return False
+        if obj == cls._simple_get("GetActiveSource"):
+            cls._trace_new_accessor(pname, obj,
+                "# get active source.", "%s = GetActiveSource()")
+        else:
+            cls._trace_new_accessor(pname, obj,
+                "# find source", "%s = FindSource('%s')", pname)
+        return True
+
+    @classmethod
+    def _create_accessor_for_view(cls, obj, pname):
+        """handle view proxy."""
+        if not obj.SMProxy.IsA("vtkSMViewProxy"):
+            return False
+        trace = TraceOutput()
+        accessor = ProxyAccessor(cls.get_varname(pname), obj)
+        if obj == cls._simple_get("GetActiveView"):
+            trace.append("# get active view")
+            trace.append("%s = GetActiveViewOrCreate('%s')" % (accessor, obj.GetXMLName()))
+        else:
+            ctor_args = "'%s', viewtype='%s'" % (pname, obj.GetXMLName())
+            trace.append("# find view")
+            trace.append("%s = FindViewOrCreate(%s)" % (accessor, ctor_args))
+        # trace view size, if present. We trace this commented out so
+        # that the playback in the GUI doesn't cause issues.
+        viewSizeAccessor = accessor.get_property("ViewSize")
+        if viewSizeAccessor:
+            trace.append([\
+                "# uncomment following to set a specific view size",
+                "# %s" % viewSizeAccessor.get_property_trace(in_ctor=False)])
+        cls.Output.append_separated(trace)
+        return True
+
+    @classmethod
+    def _create_accessor_for_representation(cls, obj, pname):
+        """handle representations."""
+        if not obj.SMProxy.IsA("vtkSMRepresentationProxy") or not hasattr(obj, "Input"):
+            return False
+        inputAccsr = cls.get_accessor(obj.Input)
+        view = simple.LocateView(obj)
+        viewAccessor = cls.get_accessor(view)
+        cls._trace_new_accessor("%sDisplay" % inputAccsr, obj,
+            "# get display properties",
+            "%s = GetDisplayProperties(%s, view=%s)", inputAccsr, viewAccessor)
+        return True
+
+    @classmethod
+    def _create_accessor_for_scalar_bar(cls, obj, pname):
+        """trace scalar bar."""
+        lutAccessor = cls.get_accessor(obj.LookupTable)
+        view = simple.LocateView(obj)
+        viewAccessor = cls.get_accessor(view)
+        varname = cls.get_varname("%sColorBar" % lutAccessor)
+        accessor = ProxyAccessor(varname, obj)
+        trace = TraceOutput()
+        trace.append(\
+            "# get color legend/bar for %s in view %s" % (lutAccessor, viewAccessor))
+        trace.append(accessor.trace_ctor(\
+            "GetScalarBar",
+            SupplementalProxy(ScalarBarProxyFilter()),
+            ctor_args="%s, %s" % (lutAccessor, viewAccessor)))
+        cls.Output.append_separated(trace)
+        return True
+
+    @classmethod
+    def _create_accessor_for_layout(cls, obj, pname):
+        view = cls._simple_get("GetActiveView")
+        if view and obj.GetViewLocation(view.SMProxy) != -1:
+            viewAccessor = cls.get_accessor(view)
+            cls._trace_new_accessor(pname, obj, "# get layout", "%s = GetLayout()")
+        else:
+            cls._trace_new_accessor(pname, obj,
+                "# get layout", "%s = GetLayoutByName(\"%s\")", pname)
+        return True
+
     @classmethod
     def rename_separate_tf_and_get_representation(cls, arrayName):
-      import re
       representation = None
       varname = arrayName
       regex = re.compile(r"(^Separate_)([0-9]*)_(.*$)")
@@ -324,8 +445,7 @@ class Trace(object):
 
     @classmethod
     def _create_accessor_for_tf(cls, proxy, regname):
-        import re
-        m = re.match("^[0-9.]*(.+)\\.%s$" % proxy.GetXMLName(), regname)
+        m = _get_tf_regname_pattern(proxy.GetXMLName()).match(regname)
         if m:
             arrayName = m.group(1)
             if proxy.GetXMLGroup() == "lookup_tables":
@@ -359,44 +479,36 @@ class Trace(object):
             trace.append("# get %s for '%s'" % (comment, arrayName))
             trace.append(accessor.trace_ctor(\
               method, SupplementalProxy(TransferFunctionProxyFilter()), ctor_args = args))
-            cls.Output.append_separated(trace.raw_data())
+            cls.Output.append_separated(trace)
             return True
         return False
 
     @classmethod
-    def _create_accessor_for_animation_proxies(cls, obj):
-        pname = cls.get_registered_name(obj, "animation")
-        if obj == simple.GetAnimationScene():
-            sceneAccessor = ProxyAccessor(cls.get_varname(pname), obj)
-            cls.Output.append_separated([\
-                "# get animation scene",
-                "%s = GetAnimationScene()" % sceneAccessor])
+    def _create_accessor_for_animation_proxies(cls, obj, pname):
+        if obj == cls._simple_get("GetAnimationScene"):
+            cls._trace_new_accessor(pname, obj,
+                "# get animation scene", "%s = GetAnimationScene()")
             return True
-        if obj == simple.GetTimeTrack():
-            accessor = ProxyAccessor(cls.get_varname(pname), obj)
-            cls.Output.append_separated([\
-                "# get time animation track",
-                "%s = GetTimeTrack()" % accessor])
+        if obj == cls._simple_get("GetTimeTrack"):
+            cls._trace_new_accessor(pname, obj,
+                "# get time animation track", "%s = GetTimeTrack()")
             return True
         if obj.GetXMLName() == "CameraAnimationCue":
             # handle camera animation cue.
             view = obj.AnimatedProxy
             viewAccessor = cls.get_accessor(view)
-            accessor = ProxyAccessor(cls.get_varname(pname), obj)
-            cls.Output.append_separated([\
+            cls._trace_new_accessor(pname, obj,
                 "# get camera animation track for the view",
-                "%s = GetCameraTrack(view=%s)" % (accessor, viewAccessor)])
+                "%s = GetCameraTrack(view=%s)", viewAccessor)
             return True
         if obj.GetXMLName() == "KeyFrameAnimationCue":
             animatedProxyAccessor = cls.get_accessor(obj.AnimatedProxy)
             animatedElement = int(obj.AnimatedElement)
             animatedPropertyName = obj.AnimatedPropertyName
-            varname = cls.get_varname("%s%sTrack" % (animatedProxyAccessor, animatedPropertyName))
-            accessor = ProxyAccessor(varname, obj)
-            cls.Output.append_separated([\
+            cls._trace_new_accessor("%s%sTrack" % (animatedProxyAccessor, animatedPropertyName), obj,
                 "# get animation track",
-                "%s = GetAnimationTrack('%s', index=%d, proxy=%s)" %\
-                    (accessor, animatedPropertyName, animatedElement, animatedProxyAccessor)])
+                "%s = GetAnimationTrack('%s', index=%d, proxy=%s)",
+                animatedPropertyName, animatedElement, animatedProxyAccessor)
             return True
         if obj.GetXMLName() == "PythonAnimationCue":
             raise Untraceable("PythonAnimationCue's are currently not supported in trace")
@@ -409,7 +521,21 @@ class Untraceable(Exception):
     def __str__(self):
         return repr(self.LogMessage)
 
+class UnknownProxy(Untraceable):
+    """Untraceable raised by :method:`.Trace.get_accessor` for proxies that
+    cannot be traced. These are often caught and ignored, so the log message
+    (which needs `repr(proxy)`) is only generated when requested."""
+    def __init__(self, proxy):
+        self.Proxy = proxy
+
+    @property
+    def LogMessage(self):
+        return "%s is not 'known' at this point. Hence, we cannot trace "\
+            "it. Skipping this action." % repr(self.Proxy)
+
 class Accessor(object):
+    __slots__ = ("Varname", "__Object")
+
     def __init__(self, varname, obj):
         self.Varname = varname
         self.__Object = obj
@@ -426,6 +552,7 @@ class Accessor(object):
         return self.__Object
 
 class RealProxyAccessor(Accessor):
+    __slots__ = ("OrderedProperties", "__PropertiesByName")
     __CreateCallbacks = []
 
     @classmethod
@@ -448,22 +575,28 @@ class RealProxyAccessor(Accessor):
         Accessor.__init__(self, varname, proxy)
 
         self.OrderedProperties = []
+        # index of OrderedProperties by property name, used by get_property().
+        self.__PropertiesByName = {}
 
         # Create accessors for properties on this proxy.
         oiter = sm.vtkSMOrderedPropertyIterator()
         oiter.SetProxy(proxy.SMProxy)
+        # bind methods used in the loop below only once.
+        get_property = proxy.GetProperty
+        make_name_valid = _make_name_valid
+        append_property = self.OrderedProperties.append
+        index_property = self.__PropertiesByName.setdefault
+        next_property = oiter.Next
         while not oiter.IsAtEnd():
-            prop_name = oiter.GetKey()
-            prop_label = oiter.GetPropertyLabel()
-            sanitized_label = sm._make_name_valid(prop_label)
-
-            prop = proxy.GetProperty(prop_name)
+            prop = get_property(oiter.GetKey())
             if not type(prop) == sm.Property:
+                sanitized_label = make_name_valid(oiter.GetPropertyLabel())
                 # Note: when PropertyTraceHelper for a property with ProxyListDomain is
                 # created, it creates accessors for all proxies in the domain as well.
                 prop_accessor = PropertyTraceHelper(sanitized_label, self)
-                self.OrderedProperties.append(prop_accessor)
-            oiter.Next()
+                append_property(prop_accessor)
+                index_property(sanitized_label, prop_accessor)
+            next_property()
         del oiter
 
     def finalize(self):
@@ -472,13 +605,13 @@ class RealProxyAccessor(Accessor):
         Accessor.finalize(self)
 
     def get_property(self, name):
-        for x in self.OrderedProperties:
-            if x.get_property_name() == name:
-                return x
-        return None
+        return self.__PropertiesByName.get(name)
 
-    def get_properties(self):
-        return self.OrderedProperties[:]
+    def get_properties(self, copy=False):
+        """Returns the PropertyTraceHelper instances for the properties on this
+        proxy. Unless `copy` is True, this is the accessor's own list and must
+        not be modified."""
+        return self.OrderedProperties[:] if copy else self.OrderedProperties
 
     def get_ctor_properties(self):
         """Returns a list of property accessors that should be specified
@@ -486,8 +619,7 @@ class RealProxyAccessor(Accessor):
         return [x for x in self.OrderedProperties if self.is_ctor_property(x)]
 
     def is_ctor_property(self, prop):
-        return prop.get_object().IsA("vtkSMInputProperty") or \
-                prop.get_object().FindDomain("vtkSMFileListDomain") != None
+        return prop.IsInputProperty or prop.HasFileListDomain
 
     def trace_properties(self, props, in_ctor):
         joiner = ",\n    " if in_ctor else "\n"
@@ -496,9 +628,20 @@ class RealProxyAccessor(Accessor):
     def trace_ctor(self, ctor, filter, ctor_args=None, skip_assignment=False,
             ctor_var=None, ctor_extra_args=None):
         args_in_ctor = str(ctor_args) if ctor_args is not None else ""
-        # trace any properties that the 'filter' tells us should be traced
-        # in ctor.
-        ctor_props = [x for x in self.OrderedProperties if filter.should_trace_in_ctor(x)]
+        # classify properties in a single pass: those that the 'filter' tells
+        # us should be traced in ctor, all the other properties that should be
+        # traced in create, and those with a ProxyListDomain.
+        ctor_props = []
+        other_props = []
+        pld_props = []
+        for x in self.OrderedProperties:
+            if filter.should_trace_in_ctor(x):
+                ctor_props.append(x)
+            elif filter.should_trace_in_create(x):
+                other_props.append(x)
+            if x.has_proxy_list_domain():
+                pld_props.append(x)
+
         ctor_props_trace = self.trace_properties(ctor_props, in_ctor=True)
         if args_in_ctor and ctor_props_trace:
             args_in_ctor = "%s, %s" % (args_in_ctor, ctor_props_trace)
@@ -509,10 +652,6 @@ class RealProxyAccessor(Accessor):
         elif ctor_extra_args:
             args_in_ctor = ctor_extra_args
 
-        # locate all the other properties that should be traced in create.
-        other_props = [x for x in self.OrderedProperties \
-            if filter.should_trace_in_create(x) and not filter.should_trace_in_ctor(x)]
-
         trace = TraceOutput()
         if not ctor is None:
             if not skip_assignment:
@@ -530,7 +669,6 @@ class RealProxyAccessor(Accessor):
         # Now, if any of the props has ProxyListDomain, we should trace their
         # "ctors" as well. Tracing ctors for ProxyListDomain proxies simply
         # means tracing their property values.
-        pld_props = [x for x in self.OrderedProperties if x.has_proxy_list_domain()]
         for prop in pld_props:
             paccessor = Trace.get_accessor(prop.get_property_value())
             if not prop.DisableSubTrace:
@@ -549,6 +687,11 @@ class PropertyTraceHelper(object):
     properites. In its constructor, RealProxyAccessor creates a
     PropertyTraceHelper for each of its properties that could potentially need
     to be traced."""
+    __slots__ = ("__PyProperty", "PropertyName", "ProxyAccessor", "FullScopedName",
+        "HasProxyListDomain", "ProxyListDomainProxyAccessors", "DisableSubTrace",
+        "IsProxyProperty", "IsInputProperty", "IsStringVectorProperty",
+        "HasFileListDomain", "__NeverTraceFlags")
+
     def __init__(self, propertyname, proxyAccessor):
         """Constructor.
 
@@ -560,6 +703,7 @@ class PropertyTraceHelper(object):
         assert type(propertyname) == str
 
         self.__PyProperty = None
+        self.__NeverTraceFlags = None
         self.PropertyName = propertyname
         self.ProxyAccessor = proxyAccessor
         self.FullScopedName = "%s.%s" % (proxyAccessor, propertyname)
@@ -567,19 +711,27 @@ class PropertyTraceHelper(object):
         pyprop = self.get_object()
         assert not pyprop is None
 
+        # the property type doesn't change, so we determine it here rather
+        # than each time the value is traced.
+        self.IsProxyProperty = isinstance(pyprop, sm.ProxyProperty)
+        self.IsStringVectorProperty = bool(pyprop.SMProperty.IsA("vtkSMStringVectorProperty"))
+
         pld_domain = pyprop.FindDomain("vtkSMProxyListDomain")
-        self.HasProxyListDomain = isinstance(pyprop, sm.ProxyProperty) and pld_domain != None
+        self.HasProxyListDomain = self.IsProxyProperty and pld_domain != None
         self.ProxyListDomainProxyAccessors = []
         self.DisableSubTrace = pyprop.GetDisableSubTrace()
+        self.IsInputProperty = bool(pyprop.IsA("vtkSMInputProperty"))
+        self.HasFileListDomain = pyprop.FindDomain("vtkSMFileListDomain") != None
         if self.HasProxyListDomain:
             # register accessors for proxies in the proxy list domain.
             # This is cheating. Since there's no accessor for a proxy in the domain
             # unless the proxy is "active" in the property. However, since ParaView
             # UI never modifies the other properties, we cheat
+            varname = self.get_varname()
+            get_proxy = pld_domain.GetProxy
+            append = self.ProxyListDomainProxyAccessors.append
             for i in xrange(pld_domain.GetNumberOfProxies()):
-                domain_proxy = pld_domain.GetProxy(i)
-                plda = ProxyAccessor(self.get_varname(), sm._getPyProxy(domain_proxy))
-                self.ProxyListDomainProxyAccessors.append(plda)
+                append(ProxyAccessor(varname, sm._getPyProxy(get_proxy(i))))
 
     def __del__(self):
         self.finalize()
@@ -626,13 +778,14 @@ class PropertyTraceHelper(object):
         will either be a string used to refer to another proxy or a string used
         to refer to the proxy in a proxy list domain."""
         myobject = self.get_object()
-        if isinstance(myobject, sm.ProxyProperty):
-            data = myobject[:]
+        if self.IsProxyProperty:
+            items = myobject[:]
             if self.has_proxy_list_domain():
-                data = ["'%s'" % x.GetXMLLabel() for x in data]
+                data = ["'%s'" % x.GetXMLLabel() for x in items]
             else:
-                data = [str(Trace.get_accessor(x)) for x in data]
-                if isinstance(myobject, sm.InputProperty):
+                get_accessor = Trace.get_accessor
+                data = [str(get_accessor(x)) for x in items]
+                if self.IsInputProperty:
                     # this is an input property, we may have to hook on to a
                     # non-zero output port. If so, we trace `OutputPort(source,
                     # port)`, else we just trace `source`.
@@ -640,14 +793,12 @@ class PropertyTraceHelper(object):
                     ports = [myobject.GetOutputPortForConnection(x) for x in range(len(data))]
                     data = [src if port==0 else "OutputPort(%s,%d)" % (src,port) \
                             for src,port in zip(data, ports)]
-            try:
-                if len(data) > 1:
-                  return "[%s]" % (", ".join(data))
-                else:
-                  return data[0]
-            except IndexError:
-                return "None"
-        elif myobject.SMProperty.IsA("vtkSMStringVectorProperty"):
+            if len(data) > 1:
+                return "[%s]" % (", ".join(data))
+            elif data:
+                return data[0]
+            return "None"
+        elif self.IsStringVectorProperty:
             # handle multiline properties (see #18480)
             return self.create_multiline_string(repr(myobject))
         else:
@@ -657,6 +808,25 @@ class PropertyTraceHelper(object):
         """Returns True if this property has a ProxyListDomain, else False."""
         return self.HasProxyListDomain
 
+    def get_never_trace_flags(self):
+        """Returns a tuple `(internal, gui_hidden, settings_linked)` used by
+        :method:`.ProxyFilter.should_never_trace`. `internal` is True for
+        internal or information-only properties, `gui_hidden` is True when the
+        property is never shown in panels and `settings_linked` is True when
+        the property is linked to settings. These are defined by the property's
+        XML and don't change, hence they are only looked up once."""
+        if self.__NeverTraceFlags is None:
+            myobject = self.get_object()
+            internal = bool(myobject.GetIsInternal() or myobject.GetInformationOnly())
+            gui_hidden = myobject.GetPanelVisibility() == "never"
+            settings_linked = False
+            hints = myobject.GetHints()
+            if hints:
+                plink = hints.FindNestedElementByName("PropertyLink")
+                settings_linked = True if plink and plink.GetAttribute("group") == "settings" else False
+            self.__NeverTraceFlags = (internal, gui_hidden, settings_linked)
+        return self.__NeverTraceFlags
+
     def get_property_name(self):
         return self.PropertyName
 
@@ -688,18 +858,16 @@ class PropertyTraceHelper(object):
 # ===================================================================================================
 class ProxyFilter(object):
     def should_never_trace(self, prop, hide_gui_hidden=True):
-        if prop.get_object().GetIsInternal() or prop.get_object().GetInformationOnly():
+        internal, gui_hidden, settings_linked = prop.get_never_trace_flags()
+        if internal:
             return True
         # should we hide properties hidden from panels? yes, generally, except
         # Views.
-        if hide_gui_hidden == True and prop.get_object().GetPanelVisibility() == "never":
+        if hide_gui_hidden == True and gui_hidden:
             return True
         # if a property is "linked" to settings, then skip it here too. We
         # should eventually add an option for user to save, yes, save these too.
-        if prop.get_object().GetHints():
-            plink = prop.get_object().GetHints().FindNestedElementByName("PropertyLink")
-            return True if plink and plink.GetAttribute("group") == "settings" else False
-        return False
+        return settings_linked
 
     def should_trace_in_create(self, prop, user_can_modify_in_create=True):
         if self.should_never_trace(prop): return False
@@ -723,15 +891,14 @@ class PipelineProxyFilter(ProxyFilter):
     def should_never_trace(self, prop):
         """overridden to avoid hiding "non-gui" properties such as FileName."""
         # should we hide properties hidden from panels?
-        if not prop.get_object().FindDomain("vtkSMFileListDomain") is None:
+        if prop.HasFileListDomain:
             return False
         else:
             return ProxyFilter.should_never_trace(self, prop)
 
     def should_trace_in_ctor(self, prop):
         if self.should_never_trace(prop): return False
-        return prop.get_object().IsA("vtkSMInputProperty") or \
-            prop.get_object().FindDomain("vtkSMFileListDomain") != None
+        return prop.IsInputProperty or prop.HasFileListDomain
 
 class ExodusIIReaderFilter(PipelineProxyFilter):
     def should_never_trace(self, prop):
@@ -838,7 +1005,22 @@ def SupplementalProxy(cls):
 # TraceItems are units of traceable actions triggered by the application using vtkSMTrace
 # ===================================================================================================
 
+def _get_py_proxy(proxy, port=0):
+    """Same as `servermanager._getPyProxy`, except that `proxy` is returned
+    as is if it is already the servermanager.Proxy for the requested port."""
+    if isinstance(proxy, sm.Proxy) and proxy.Port == port:
+        return proxy
+    return sm._getPyProxy(proxy, port)
+
+def _get_output_port_text(producer, port):
+    """Returns the text used to refer to output `port` of the pipeline proxy
+    whose accessor (or variable name) is `producer`."""
+    if port > 0:
+        return "OutputPort(%s, %d)" % (producer, port)
+    return str(producer)
+
 class TraceItem(object):
+    __slots__ = ("__weakref__",)
     def __init__(self):
         pass
     def finalize(self):
@@ -847,53 +1029,57 @@ class TraceItem(object):
 class NestableTraceItem(TraceItem):
     """Base class for trace item that can be nested i.e.
     can trace when some other trace item is active."""
-    pass
+    __slots__ = ()
 
 class BookkeepingItem(NestableTraceItem):
     """Base class for trace items that are only used for
     book keeping and don't affect the trace itself."""
-    pass
+    __slots__ = ()
 
 class RegisterPipelineProxy(TraceItem):
     """This traces the creation of a Pipeline Proxy such as
     sources/filters/readers etc."""
+    __slots__ = ("Proxy",)
 
     def __init__(self, proxy):
         TraceItem.__init__(self)
-        self.Proxy = sm._getPyProxy(proxy)
+        self.Proxy = _get_py_proxy(proxy)
 
     def finalize(self):
         pname = Trace.get_registered_name(self.Proxy, "sources")
         varname = Trace.get_varname(pname)
         accessor = ProxyAccessor(varname, self.Proxy)
 
-        ctor = sm._make_name_valid(self.Proxy.GetXMLLabel())
+        ctor = _make_name_valid(self.Proxy.GetXMLLabel())
         trace = TraceOutput()
         trace.append("# create a new '%s'" % self.Proxy.GetXMLLabel())
         filter_type = ExodusIIReaderFilter() \
             if isinstance(self.Proxy, sm.ExodusIIReaderProxy) else PipelineProxyFilter()
         trace.append(accessor.trace_ctor(ctor, filter_type))
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
         TraceItem.finalize(self)
 
 class Delete(TraceItem):
     """This traces the deletion of a Pipeline proxy"""
+    __slots__ = ()
     def __init__(self, proxy):
         TraceItem.__init__(self)
-        proxy = sm._getPyProxy(proxy)
+        proxy = _get_py_proxy(proxy)
         accessor = Trace.get_accessor(proxy)
+        varname = str(accessor)
         Trace.Output.append_separated([\
-            "# destroy %s" % (accessor),
-            "Delete(%s)" % (accessor),
-            "del %s" % accessor])
+            "# destroy %s" % varname,
+            "Delete(%s)" % varname,
+            "del %s" % varname])
         accessor.finalize()
         del accessor
         import gc
         gc.collect()
 
 class CleanupAccessor(BookkeepingItem):
+    __slots__ = ("Proxy",)
     def __init__(self, proxy):
-        self.Proxy = sm._getPyProxy(proxy)
+        self.Proxy = _get_py_proxy(proxy)
     def finalize(self):
         if Trace.has_accessor(self.Proxy):
             accessor = Trace.get_accessor(self.Proxy)
@@ -908,14 +1094,22 @@ class BlockTraceItems(NestableTraceItem):
     no trace items will be created by `_create_trace_item_internal`
     until this instance is cleaned up.
     """
-    pass
+    __slots__ = ()
+
+def _get_modified_properties(props, mtime):
+    """Returns the PropertyTraceHelper instances in `props` whose property was
+    modified after `mtime`."""
+    # call GetMTime() on the vtkSMProperty directly rather than going through
+    # servermanager.Property.__getattr__ for each property.
+    return [prop for prop in props if mtime < prop.get_object().SMProperty.GetMTime()]
 
 class PropertiesModified(NestableTraceItem):
     """Traces properties modified on a specific proxy."""
+    __slots__ = ("ProxyAccessor", "MTime", "Comment")
     def __init__(self, proxy, comment=None):
         TraceItem.__init__(self)
 
-        proxy = sm._getPyProxy(proxy)
+        proxy = _get_py_proxy(proxy)
         self.ProxyAccessor = Trace.get_accessor(proxy)
         self.MTime = vtkTimeStamp()
         self.MTime.Modified()
@@ -923,25 +1117,33 @@ class PropertiesModified(NestableTraceItem):
             "# Properties modified on %s" % str(self.ProxyAccessor)
 
     def finalize(self):
-        props = self.ProxyAccessor.get_properties()
-        props_to_trace = [k for k in props if self.MTime.GetMTime() < k.get_object().GetMTime()]
-        if props_to_trace:
-            Trace.Output.append_separated([
-                self.Comment,
-                self.ProxyAccessor.trace_properties(props_to_trace, in_ctor=False)])
+        mtime = self.MTime.GetMTime()
 
         # Remember, we are monitoring a proxy to trace any properties on it that
         # are modified. When that's the case, properties on a proxy-property on
         # that proxy may have been modified too and it would make sense to trace
         # those as well (e.g. ScalarOpacityFunction on a PVLookupTable proxy).
-        # This loop handles that. We explicitly skip "InputProperty"s, however
+        # We collect those proxy-properties in the same pass that collects the
+        # modified properties. We explicitly skip "InputProperty"s, however
         # since tracing properties modified on the input should not be a
         # responsibility of this method.
-        for prop in props:
-            if not isinstance(prop.get_object(), sm.ProxyProperty) or \
-                    isinstance(prop.get_object(), sm.InputProperty) or \
-                    prop.DisableSubTrace:
-                continue
+        props_to_trace = []
+        subproxy_props = []
+        append_to_trace = props_to_trace.append
+        append_subproxy = subproxy_props.append
+        for prop in self.ProxyAccessor.get_properties():
+            if mtime < prop.get_object().SMProperty.GetMTime():
+                append_to_trace(prop)
+            if prop.IsProxyProperty and not prop.IsInputProperty and \
+                    not prop.DisableSubTrace:
+                append_subproxy(prop)
+
+        if props_to_trace:
+            Trace.Output.append_separated([
+                self.Comment,
+                self.ProxyAccessor.trace_properties(props_to_trace, in_ctor=False)])
+
+        for prop in subproxy_props:
             val = prop.get_property_value()
             try:
                 # val can be None or list of proxies. We are not tracing list of
@@ -952,8 +1154,7 @@ class PropertiesModified(NestableTraceItem):
             except Untraceable:
                 continue
             else:
-                props = valaccessor.get_properties()
-                props_to_trace = [k for k in props if self.MTime.GetMTime() < k.get_object().GetMTime()]
+                props_to_trace = _get_modified_properties(valaccessor.get_properties(), mtime)
                 if props_to_trace:
                     Trace.Output.append_separated([
                         "# Properties modified on %s" % valaccessor,
@@ -962,9 +1163,10 @@ class PropertiesModified(NestableTraceItem):
 
 class ScalarBarInteraction(NestableTraceItem):
     """Traces scalar bar interactions"""
+    __slots__ = ("ProxyAccessor", "MTime", "Comment")
     def __init__(self, proxy, comment=None):
         TraceItem.__init__(self)
-        proxy = sm._getPyProxy(proxy)
+        proxy = _get_py_proxy(proxy)
         self.ProxyAccessor = Trace.get_accessor(proxy)
         self.MTime = vtkTimeStamp()
         self.MTime.Modified()
@@ -972,8 +1174,8 @@ class ScalarBarInteraction(NestableTraceItem):
             "# Properties modified on %s" % str(self.ProxyAccessor)
 
     def finalize(self):
-        props = self.ProxyAccessor.get_properties()
-        props_to_trace = [k for k in props if self.MTime.GetMTime() < k.get_object().GetMTime()]
+        props_to_trace = _get_modified_properties(
+            self.ProxyAccessor.get_properties(), self.MTime.GetMTime())
         afilter = ScalarBarProxyFilter()
         props_to_trace = [k for k in props_to_trace if not afilter.should_never_trace(k)]
         if props_to_trace:
@@ -983,12 +1185,13 @@ class ScalarBarInteraction(NestableTraceItem):
 
 class Show(TraceItem):
     """Traces Show"""
+    __slots__ = ("ProducerAccessor", "ViewAccessor", "OutputPort", "Display", "Comment")
     def __init__(self, producer, port, view, display, comment=None):
         TraceItem.__init__(self)
 
-        producer = sm._getPyProxy(producer)
-        view = sm._getPyProxy(view)
-        display = sm._getPyProxy(display)
+        producer = _get_py_proxy(producer)
+        view = _get_py_proxy(view)
+        display = _get_py_proxy(display)
 
         self.ProducerAccessor = Trace.get_accessor(producer)
         self.ViewAccessor = Trace.get_accessor(view)
@@ -1006,19 +1209,14 @@ class Show(TraceItem):
         else:
             accessor = Trace.get_accessor(display)
             trace_ctor = False
-        port = self.OutputPort
-
         if not self.Comment is None:
             output.append("# %s" % self.Comment)
         else:
             output.append("# show data in view")
-        if port > 0:
-            output.append("%s = Show(OutputPort(%s, %d), %s)" % \
-                (str(accessor), str(self.ProducerAccessor), port, str(self.ViewAccessor)))
-        else:
-            output.append("%s = Show(%s, %s)" % \
-                (str(accessor), str(self.ProducerAccessor), str(self.ViewAccessor)))
-        Trace.Output.append_separated(output.raw_data())
+        output.append("%s = Show(%s, %s)" % (accessor,
+            _get_output_port_text(self.ProducerAccessor, self.OutputPort),
+            self.ViewAccessor))
+        Trace.Output.append_separated(output)
 
         output = TraceOutput()
         if trace_ctor:
@@ -1027,74 +1225,73 @@ class Show(TraceItem):
             if ctor_trace:
                 output.append("# trace defaults for the display properties.")
                 output.append(ctor_trace)
-        Trace.Output.append_separated(output.raw_data())
+        Trace.Output.append_separated(output)
         TraceItem.finalize(self)
 
 class Hide(TraceItem):
     """Traces Hide"""
+    __slots__ = ()
     def __init__(self, producer, port, view):
         TraceItem.__init__(self)
 
-        producer = sm._getPyProxy(producer)
-        view = sm._getPyProxy(view)
+        producer = _get_py_proxy(producer)
+        view = _get_py_proxy(view)
         producerAccessor = Trace.get_accessor(producer)
         viewAccessor = Trace.get_accessor(view)
 
         Trace.Output.append_separated([\
           "# hide data in view",
-          "Hide(%s, %s)" % (str(producerAccessor), str(viewAccessor)) if port == 0 else \
-              "Hide(OutputPort(%s, %d), %s)" % (str(producerAccessor), port, str(viewAccessor))])
+          "Hide(%s, %s)" % (_get_output_port_text(producerAccessor, port), viewAccessor)])
 
 class SetScalarColoring(TraceItem):
     """Trace vtkSMPVRepresentationProxy.SetScalarColoring"""
+    __slots__ = ("Display", "ArrayName", "AttributeType", "Component", "Lut", "Separate")
     def __init__(self, display, arrayname, attribute_type, component=None, separate=False, lut=None):
         TraceItem.__init__(self)
 
-        self.Display = sm._getPyProxy(display)
+        self.Display = _get_py_proxy(display)
         self.ArrayName = arrayname
         self.AttributeType = attribute_type
         self.Component = component
-        self.Lut = sm._getPyProxy(lut)
+        self.Lut = _get_py_proxy(lut)
         self.Separate = separate
 
     def finalize(self):
         TraceItem.finalize(self)
 
+        displayName = str(Trace.get_accessor(self.Display))
         if self.ArrayName:
+            association = sm.GetAssociationAsString(self.AttributeType)
             if self.Component is None:
               if self.Separate:
                 Trace.Output.append_separated([\
                     "# set scalar coloring using an separate color/opacity maps",
                     "ColorBy(%s, ('%s', '%s'), %s)" % (\
-                        str(Trace.get_accessor(self.Display)),
-                        sm.GetAssociationAsString(self.AttributeType),
+                        displayName, association,
                         self.ArrayName, self.Separate)])
               else:
                 Trace.Output.append_separated([\
                     "# set scalar coloring",
                     "ColorBy(%s, ('%s', '%s'))" % (\
-                        str(Trace.get_accessor(self.Display)),
-                        sm.GetAssociationAsString(self.AttributeType),
+                        displayName, association,
                         self.ArrayName)])
             else:
               if self.Separate:
                 Trace.Output.append_separated([\
                     "# set scalar coloring using an separate color/opacity maps",
                     "ColorBy(%s, ('%s', '%s', '%s'), %s)" % (\
-                        str(Trace.get_accessor(self.Display)),
-                        sm.GetAssociationAsString(self.AttributeType),
+                        displayName, association,
                         self.ArrayName, self.Component, self.Separate)])
               else:
                 Trace.Output.append_separated([\
                     "# set scalar coloring",
                     "ColorBy(%s, ('%s', '%s', '%s'))" % (\
-                        str(Trace.get_accessor(self.Display)),
-                        sm.GetAssociationAsString(self.AttributeType),
+                        displayName, association,
                         self.ArrayName, self.Component)])
         else:
             Trace.Output.append_separated([\
                 "# turn off scalar coloring",
-                "ColorBy(%s, None)" % str(Trace.get_accessor(self.Display))])
+                "ColorBy(%s, None)" % displayName])
 
         # only for "Fully Trace Supplemental Proxies" support
         if self.Lut:
@@ -1102,9 +1299,10 @@ class SetScalarColoring(TraceItem):
 
 class RegisterViewProxy(TraceItem):
     """Traces creation of a new view (vtkSMParaViewPipelineController::RegisterViewProxy)."""
+    __slots__ = ("Proxy",)
     def __init__(self, proxy):
         TraceItem.__init__(self)
-        self.Proxy = sm._getPyProxy(proxy)
+        self.Proxy = _get_py_proxy(proxy)
         assert not self.Proxy is None
 
     def finalize(self):
@@ -1135,7 +1333,7 @@ class RegisterViewProxy(TraceItem):
         #         lightsList.append(lightAccessor)
         #     trace.append("%s.AdditionalLights = [%s]" % (Trace.get_accessor(self.Proxy), ", ".join(lightsList)))
 
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
         viewSizeAccessor = accessor.get_property("ViewSize")
         if viewSizeAccessor and not filter.should_trace_in_create(viewSizeAccessor):
@@ -1149,10 +1347,11 @@ class RegisterViewProxy(TraceItem):
 
 class RegisterLightProxy(TraceItem):
     """Traces creation of a new light (vtkSMParaViewPipelineController::RegisterLightProxy)."""
+    __slots__ = ("Proxy", "View")
     def __init__(self, proxy, view=None):
         TraceItem.__init__(self)
-        self.Proxy = sm._getPyProxy(proxy)
-        self.View = sm._getPyProxy(view)
+        self.Proxy = _get_py_proxy(proxy)
+        self.View = _get_py_proxy(view)
         assert not self.Proxy is None
 
     def finalize(self):
@@ -1168,15 +1367,16 @@ class RegisterLightProxy(TraceItem):
             trace.append(accessor.trace_ctor("AddLight", filter, ctor_args="view=%s" % viewAccessor))
         else:
             trace.append(accessor.trace_ctor("CreateLight", filter))
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
         TraceItem.finalize(self)
 
 class ExportView(TraceItem):
+    __slots__ = ()
     def __init__(self, view, exporter, filename):
         TraceItem.__init__(self)
 
-        view = sm._getPyProxy(view)
-        exporter = sm._getPyProxy(exporter)
+        view = _get_py_proxy(view)
+        exporter = _get_py_proxy(exporter)
 
         viewAccessor = Trace.get_accessor(view)
         exporterAccessor = ProxyAccessor("temporaryExporter", exporter)
@@ -1189,21 +1389,19 @@ class ExportView(TraceItem):
               skip_assignment=True))
         exporterAccessor.finalize() # so that it will get deleted
         del exporterAccessor
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
 class SaveData(TraceItem):
+    __slots__ = ()
     def __init__(self, writer, filename, source, port):
         TraceItem.__init__(self)
 
-        source = sm._getPyProxy(source, port)
+        source = _get_py_proxy(source, port)
         sourceAccessor = Trace.get_accessor(source)
-        writer = sm._getPyProxy(writer)
+        writer = _get_py_proxy(writer)
         writerAccessor = ProxyAccessor("temporaryWriter", writer)
 
-        if port > 0:
-            ctor_args_1 = "OutputPort(%s, %d)" % (sourceAccessor, port)
-        else:
-            ctor_args_1 = "%s" % sourceAccessor
+        ctor_args_1 = _get_output_port_text(sourceAccessor, port)
 
         trace = TraceOutput()
         trace.append("# save data")
@@ -1214,21 +1412,22 @@ class SaveData(TraceItem):
         writerAccessor.finalize() # so that it will get deleted.
         del writerAccessor
         del writer
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
 class SaveScreenshotOrAnimation(TraceItem):
+    __slots__ = ()
     def __init__(self, helper, filename, view, layout, mode_screenshot=False):
         TraceItem.__init__(self)
         assert(view != None or layout != None)
 
-        helper = sm._getPyProxy(helper)
+        helper = _get_py_proxy(helper)
         helperAccessor = ProxyAccessor("temporaryHelper", helper)
 
         if view:
-            view = sm._getPyProxy(view)
+            view = _get_py_proxy(view)
             ctor_args_1 = "%s" % Trace.get_accessor(view)
         elif layout:
-            layout = sm._getPyProxy(layout)
+            layout = _get_py_proxy(layout)
             ctor_args_1 = "%s" % Trace.get_accessor(layout)
 
         trace = TraceOutput()
@@ -1257,13 +1456,14 @@ class SaveScreenshotOrAnimation(TraceItem):
         helperAccessor.finalize()
         del helperAccessor
         del helper
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
 class LoadState(TraceItem):
+    __slots__ = ()
     def __init__(self, filename, options):
         TraceItem.__init__(self)
 
-        options = sm._getPyProxy(options)
+        options = _get_py_proxy(options)
         optionsAccessor = ProxyAccessor("temporaryOptions", options)
 
         trace = TraceOutput()
@@ -1275,12 +1475,13 @@ class LoadState(TraceItem):
         optionsAccessor.finalize() # so that it will get deleted.
         del optionsAccessor
         del options
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
 class RegisterLayoutProxy(TraceItem):
+    __slots__ = ("Layout",)
     def __init__(self, layout):
         TraceItem.__init__(self)
-        self.Layout = sm._getPyProxy(layout)
+        self.Layout = _get_py_proxy(layout)
     def finalize(self):
         pname = Trace.get_registered_name(self.Layout, "layouts")
         accessor = ProxyAccessor(Trace.get_varname(pname), self.Layout)
@@ -1290,6 +1491,7 @@ class RegisterLayoutProxy(TraceItem):
         TraceItem.finalize(self)
 
 class LoadPlugin(TraceItem):
+    __slots__ = ()
     def __init__(self, filename, remote):
         Trace.Output.append_separated([\
                 "# load plugin",
@@ -1298,9 +1500,10 @@ class LoadPlugin(TraceItem):
 class CreateAnimationTrack(TraceItem):
     # FIXME: animation tracing support in general needs to be revamped after moving
     # animation control logic to the server manager from Qt layer.
+    __slots__ = ("Cue",)
     def __init__(self, cue):
         TraceItem.__init__(self)
-        self.Cue = sm._getPyProxy(cue)
+        self.Cue = _get_py_proxy(cue)
 
     def finalize(self):
         TraceItem.finalize(self)
@@ -1316,20 +1519,21 @@ class CreateAnimationTrack(TraceItem):
         for keyframeProxy in self.Cue.KeyFrames:
             pname = Trace.get_registered_name(keyframeProxy, "animation")
             kfaccessor = ProxyAccessor(Trace.get_varname(pname), keyframeProxy)
-            ctor = sm._make_name_valid(keyframeProxy.GetXMLLabel())
+            ctor = _make_name_valid(keyframeProxy.GetXMLLabel())
             trace.append_separated("# create a key frame")
             trace.append(kfaccessor.trace_ctor(ctor, AnimationProxyFilter()))
 
         # Now trace properties on the cue.
         trace.append_separated("# initialize the animation track")
         trace.append(accessor.trace_ctor(None, AnimationProxyFilter()))
-        Trace.Output.append_separated(trace.raw_data())
+        Trace.Output.append_separated(trace)
 
 class RenameProxy(TraceItem):
     "Trace renaming of a source proxy."
+    __slots__ = ("Accessor", "Proxy")
     def __init__(self, proxy):
         TraceItem.__init__(self)
-        proxy = sm._getPyProxy(proxy)
+        proxy = _get_py_proxy(proxy)
 
         if Trace.get_registered_name(proxy, "sources"):
             self.Accessor = Trace.get_accessor(proxy)
@@ -1347,13 +1551,14 @@ class RenameProxy(TraceItem):
 
 class SetCurrentProxy(TraceItem):
     """Traces change in active view/source etc."""
+    __slots__ = ()
     def __init__(self, selmodel, proxy, command):
         TraceItem.__init__(self)
         if proxy and proxy.IsA("vtkSMOutputPort"):
             # FIXME: need to handle port number.
-            proxy = sm._getPyProxy(proxy.GetSourceProxy())
+            proxy = _get_py_proxy(proxy.GetSourceProxy())
         else:
-            proxy = sm._getPyProxy(proxy)
+            proxy = _get_py_proxy(proxy)
         accessor = Trace.get_accessor(proxy)
         pxm = selmodel.GetSessionProxyManager()
         if selmodel is pxm.GetSelectionModel("ActiveView"):
@@ -1368,6 +1573,7 @@ class SetCurrentProxy(TraceItem):
             raise Untraceable("Unknown selection model")
 
 class CallMethod(TraceItem):
+    __slots__ = ()
     def __init__(self, proxy, methodname, *args, **kwargs):
         TraceItem.__init__(self)
         trace = self.get_trace(proxy, methodname, args, kwargs)
@@ -1376,24 +1582,39 @@ class CallMethod(TraceItem):
 
     def get_trace(self, proxy, methodname, args, kwargs):
         to_trace = []
-        try:
-            to_trace.append("# " + kwargs["comment"])
-            del kwargs["comment"]
-        except KeyError:
-            pass
-        accessor = Trace.get_accessor(sm._getPyProxy(proxy))
-        args = [str(CallMethod.marshall(x)) for x in args]
-        args += ["%s=%s" % (key, CallMethod.marshall(val)) for key, val in kwargs.items()]
-        to_trace.append("%s.%s(%s)" % (accessor, methodname, ", ".join(args)))
+        comment = kwargs.pop("comment", None)
+        if comment is not None:
+            to_trace.append("# " + comment)
+        accessor = Trace.get_accessor(_get_py_proxy(proxy))
+        to_trace.append("%s.%s(%s)" % (accessor, methodname,
+            CallMethod.marshall_arguments(args, kwargs)))
         return to_trace
 
+    @classmethod
+    def marshall_arguments(cls, args, kwargs):
+        """Returns the text for the arguments of a traced call with positional
+        arguments `args` and keyword arguments `kwargs`."""
+        marshall = cls.marshall
+        margs = [str(marshall(x)) for x in args]
+        margs.extend("%s=%s" % (key, marshall(val)) for key, val in kwargs.items())
+        return ", ".join(margs)
+
     @classmethod
     def marshall(cls, x):
-        try:
-            if x.IsA("vtkSMProxy"):
-                return Trace.get_accessor(sm._getPyProxy(x))
-        except AttributeError:
-            return "'%s'" % x if type(x) == str else x
+        # most arguments are plain python values, check for those before
+        # looking for vtkObject API.
+        xtype = type(x)
+        if xtype == str:
+            return "'%s'" % x
+        if xtype in (int, float, bool):
+            return x
+        isa = getattr(x, "IsA", None)
+        if isa is None:
+            return x
+        if isa("vtkSMProxy"):
+            return Trace.get_accessor(_get_py_proxy(x))
+        # other vtkObjects cannot be traced.
+        return None
 
 def _bind_on_event(ref):
     def _callback(obj, string):
@@ -1404,6 +1625,7 @@ class CallMethodIfPropertiesModified(CallMethod):
     """Similar to CallMethod, except that the trace will get logged only
     if the proxy fires PropertiesModified event before the trace-item is
     finalized."""
+    __slots__ = ("proxy", "methodname", "args", "kwargs", "tag", "modified")
     def __init__(self, proxy, methodname, *args, **kwargs):
         self.proxy = proxy
         self.methodname = methodname
@@ -1425,21 +1647,20 @@ class CallMethodIfPropertiesModified(CallMethod):
             self.proxy.RemoveObserver(self.tag)
 
 class CallFunction(TraceItem):
+    __slots__ = ()
     def __init__(self, functionname, *args, **kwargs):
         TraceItem.__init__(self)
         to_trace = []
-        try:
-            to_trace.append("# " + kwargs["comment"])
-            del kwargs["comment"]
-        except KeyError:
-            pass
-        args = [str(CallMethod.marshall(x)) for x in args]
-        args += ["%s=%s" % (key, CallMethod.marshall(val)) for key, val in kwargs.items()]
-        to_trace.append("%s(%s)" % (functionname, ", ".join(args)))
+        comment = kwargs.pop("comment", None)
+        if comment is not None:
+            to_trace.append("# " + comment)
+        to_trace.append("%s(%s)" % (functionname,
+            CallMethod.marshall_arguments(args, kwargs)))
         Trace.Output.append_separated(to_trace)
 
 class SaveCameras(BookkeepingItem):
     """This is used to request recording of cameras in trace"""
+    __slots__ = ()
     # This is a little hackish at this point. We'll figure something cleaner out
     # in time.
     def __init__(self, proxy=None):
@@ -1450,7 +1671,7 @@ class SaveCameras(BookkeepingItem):
     @classmethod
     def get_trace(cls, proxy=None):
         trace = TraceOutput()
-        proxy = sm._getPyProxy(proxy)
+        proxy = _get_py_proxy(proxy)
         if proxy is None:
             views = [x for x in simple.GetViews() if Trace.has_accessor(x)]
             for v in views:
@@ -1482,31 +1703,41 @@ class SaveCameras(BookkeepingItem):
 
 # __ActiveTraceItems is simply used to keep track of items that are currently
 # active to avoid non-nestable trace items from being created when previous
-# items are active.
+# items are active. Each entry is a weakref whose callback removes it from the
+# list once the item is collected, so the list only holds live items and
+# doesn't have to be compacted on every trace event.
 __ActiveTraceItems = []
 
+def _remove_active_trace_item(ref):
+    try:
+        __ActiveTraceItems.remove(ref)
+    except ValueError:
+        pass
+
+# _TRACE_ITEM_TYPES maps the name of each TraceItem type defined in this module
+# to a tuple `(type, is_nestable, is_bookkeeping)`, so that
+# _create_trace_item_internal does not have to search the module globals and
+# check the type hierarchy on every trace event.
+_TRACE_ITEM_TYPES = dict((name, (obj, issubclass(obj, NestableTraceItem), issubclass(obj, BookkeepingItem))) \
+    for name, obj in globals().items() if isinstance(obj, type) and issubclass(obj, TraceItem))
+
 def _create_trace_item_internal(key, args=None, kwargs=None):
-    global __ActiveTraceItems
-
-    # trim __ActiveTraceItems to remove None references.
-    __ActiveTraceItems = [x for x in __ActiveTraceItems if not x() is None]
-
-    g = globals()
-    if key in g and callable(g[key]):
-        args = args if args else []
-        kwargs = kwargs if kwargs else {}
-        traceitemtype = g[key]
-        if len(__ActiveTraceItems) == 0 or \
-                issubclass(traceitemtype, NestableTraceItem):
-            if len(__ActiveTraceItems) > 0 and \
-                    isinstance(__ActiveTraceItems[-1](), BlockTraceItems):
-                raise Untraceable("Not tracing since `BlockTraceItems` is active.")
-            instance = traceitemtype(*args, **kwargs)
-            if not issubclass(traceitemtype, BookkeepingItem):
-                __ActiveTraceItems.append(weakref.ref(instance))
-            return instance
-        raise Untraceable("Non-nestable trace item. Ignoring in current context.")
-    raise Untraceable("Unknown trace item type %s" % key)
+    try:
+        traceitemtype, nestable, bookkeeping = _TRACE_ITEM_TYPES[key]
+    except KeyError:
+        raise Untraceable("Unknown trace item type %s" % key)
+
+    args = args if args else []
+    kwargs = kwargs if kwargs else {}
+    if len(__ActiveTraceItems) == 0 or nestable:
+        if len(__ActiveTraceItems) > 0 and \
+                isinstance(__ActiveTraceItems[-1](), BlockTraceItems):
+            raise Untraceable("Not tracing since `BlockTraceItems` is active.")
+        instance = traceitemtype(*args, **kwargs)
+        if not bookkeeping:
+            __ActiveTraceItems.append(weakref.ref(instance, _remove_active_trace_item))
+        return instance
+    raise Untraceable("Non-nestable trace item. Ignoring in current context.")
     #print ("Hello again", key, args)
     #return A(key)
 
@@ -1555,6 +1786,13 @@ def get_current_trace_output(raw=False):
     """Returns the trace generated so far in the tracing process."""
     return str(Trace.Output) if not raw else Trace.Output.raw_data()
 
+def get_current_trace_output_since(offset=0):
+    """Returns a tuple `(text, offset)` where `text` is the trace generated
+    since `offset`, as returned by a previous call to this function, and
+    `offset` is the value to pass to the next call. Use 0 to get the trace
+    generated so far."""
+    return Trace.Output.get_since(offset)
+
 def get_current_trace_output_and_reset(raw=False):
     """Equivalent to calling::
 